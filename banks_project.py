@@ -1,19 +1,94 @@
 # Code for ETL operations on Country-GDP data
-from io import StringIO
+import atexit
+import csv
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from io import BytesIO
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import sqlite3
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 #from icecream import ic
+# pandas, numpy and sqlite3 are imported where they are used to keep start-up light
+
+# Shared HTTP session so repeated fetches reuse keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                       max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# On-disk cache for archived pages; web.archive.org snapshots never change
+_CACHE_DIR = './cache'
+_IMMUTABLE_URL_PREFIX = 'https://web.archive.org/web/'
+
+# First table following the heading span whose text equals $s
+_TABLE_AFTER_SPAN_XPATH = '//span[normalize-space(text())=$s]/following::table[1]'
+
+# Set ETL_PARALLEL_QUERIES=1 to run the post-load queries in a thread pool. Only
+# worth it for heavy queries: for trivial SELECTs the extra connections cost more
+_PARALLEL_QUERIES = os.environ.get('ETL_PARALLEL_QUERIES', '0') == '1'
+
+# SQLite column types by numpy dtype kind; anything else is stored as TEXT
+_SQLITE_TYPES = {'b': 'INTEGER', 'i': 'INTEGER', 'u': 'INTEGER', 'f': 'REAL'}
+
+
+# Log file handle, opened lazily on the first log call and reused afterwards
+_LOG_FH = None
+
+# Set ETL_LOG=0 to skip writing log entries entirely
+_LOG_ENABLED = os.environ.get('ETL_LOG', '1') != '0'
+
+
+def _get_log_handle():
+    """ This function opens the log file once, line-buffered, and
+    returns the same handle on every later call. """
+
+    global _LOG_FH
+    if _LOG_FH is None:
+        _LOG_FH = open('./logs/code_log.txt', 'a', buffering=1)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
 
 
 def log_progress(message):
     """This function logs the mentioned message of a given stage of the
     code execution to a log file. Function returns nothing"""
 
-    with open('./logs/code_log.txt', 'a') as f:
-        f.write(f'{datetime.now()}: {message}\n')
+    if not _LOG_ENABLED:
+        return
+
+    _get_log_handle().write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {message}\n")
+
+
+def fetch_page(url):
+    """ This function downloads the page at the given url and returns
+    its raw bytes. Archived snapshots are served from the on-disk
+    cache after the first download. """
+
+    cache_path = None
+    if url.startswith(_IMMUTABLE_URL_PREFIX):
+        cache_path = os.path.join(_CACHE_DIR, hashlib.blake2b(url.encode()).hexdigest())
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return f.read()
+
+    response = _SESSION.get(url, timeout=(5, 30), stream=False)
+    response.raise_for_status()
+
+    if cache_path is not None:
+        # A cache that cannot be written must not fail a successful download
+        try:
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            with open(cache_path + '.tmp', 'wb') as f:
+                f.write(response.content)
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError as e:
+            log_progress(f'Could not write page cache {cache_path}: {e}')
+
+    return response.content
 
 
 def extract(url, table_attribs):
@@ -21,27 +96,50 @@ def extract(url, table_attribs):
     information from the website and save it to a data frame. The
     function returns the data frame for further processing. """
 
-    soup = BeautifulSoup(requests.get(url).text, 'html.parser')
-    table = soup.find('span', string=table_attribs).find_next('table')
-    df = pd.read_html(StringIO(str(table)))[0]
+    import pandas as pd
+    from lxml import etree, html
+
+    tree = html.fromstring(fetch_page(url))
+    table = tree.xpath(_TABLE_AFTER_SPAN_XPATH, s=table_attribs)[0]
+    df = pd.read_html(BytesIO(etree.tostring(table, method='html')), flavor='lxml')[0]
 
     log_progress('Data extraction complete. Initiating Transformation process')
 
     return df
 
 
+@lru_cache(maxsize=8)
+def _load_rates(csv_path, mtime):
+    """ This function reads the exchange rate CSV file once per
+    path and modification time. Returns a tuple of (currency, rate)
+    pairs. """
+
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # skip the header row
+        return tuple((row[0], float(row[1])) for row in reader if row)
+
+
 def transform(df, csv_path):
     """ This function accesses the CSV file for exchange rate
-    information, and adds three columns to the data frame, each
+    information, and returns a new data frame with added columns, each
     containing the transformed version of Market Cap column to
     respective currencies"""
 
-    exchange_rate = pd.read_csv(csv_path, index_col=0).to_dict()['Rate']
+    import numpy as np
+    import pandas as pd
 
-    df['MC_GBP_Billion'] = round(df['Market cap (US$ billion)'] * exchange_rate['GBP'], 2)
-    df['MC_EUR_Billion'] = round(df['Market cap (US$ billion)'] * exchange_rate['EUR'], 2)
-    df['MC_INR_Billion'] = round(df['Market cap (US$ billion)'] * exchange_rate['INR'], 2)
-    df['MC_PKR_Billion'] = round(df['Market cap (US$ billion)'] * exchange_rate['PKR'], 2)
+    exchange_rate = dict(_load_rates(csv_path, os.path.getmtime(csv_path)))
+
+    currencies = ['GBP', 'EUR', 'INR', 'PKR']
+    rates = np.array([exchange_rate[c] for c in currencies], dtype=np.float64)
+    mc = df['Market cap (US$ billion)'].to_numpy(dtype=np.float64, copy=False)
+
+    # Convert all currencies in one broadcast instead of one pass per column,
+    # then attach the new columns with a single concat
+    extra = pd.DataFrame(np.round(mc[:, None] * rates[None, :], 2),
+                         columns=[f'MC_{c}_Billion' for c in currencies], index=df.index)
+    df = pd.concat([df, extra], axis=1)
 
     print(df)
 
@@ -54,16 +152,52 @@ def load_to_csv(df, output_path):
     """ This function saves the final data frame as a CSV file in
     the provided path. Function returns nothing."""
 
-    df.to_csv(output_path)
+    try:
+        # Optional: polars writes CSV with a multi-threaded serializer, but needs
+        # pyarrow to convert string columns; fall back to pandas without either
+        import polars as pl
+        pl.from_pandas(df).write_csv(output_path)
+    except ImportError:
+        df.to_csv(output_path, index=False)
 
     log_progress('Data saved to CSV file')
 
 
+def _sqlite_rows(df):
+    """ This function returns the data frame rows as tuples that sqlite3
+    can bind: missing values become None and datetimes ISO strings. """
+
+    values = df.astype(object)
+    for col, dtype in df.dtypes.items():
+        if dtype.kind == 'M':
+            values[col] = df[col].map(lambda ts: ts.isoformat(), na_action='ignore')
+    return values.where(df.notna(), None).itertuples(index=False, name=None)
+
+
 def load_to_db(df, sql_connection, table_name):
     """ This function saves the final data frame to a database
     table with the provided name. Function returns nothing."""
 
-    df.to_sql(table_name, sql_connection, if_exists='replace', index=False)
+    # Bulk-load settings: the database is rebuilt on every run, so durability
+    # is traded for speed and the whole load runs as one transaction
+    sql_connection.execute('PRAGMA journal_mode=MEMORY')
+    sql_connection.execute('PRAGMA synchronous=OFF')
+    sql_connection.execute('PRAGMA temp_store=MEMORY')
+
+    cols = ', '.join('"{}"'.format(c.replace('"', '""')) for c in df.columns)
+    col_defs = ', '.join('"{}" {}'.format(c.replace('"', '""'), _SQLITE_TYPES.get(t.kind, 'TEXT'))
+                         for c, t in df.dtypes.items())
+    placeholders = ', '.join('?' * len(df.columns))
+
+    with sql_connection:
+        # sqlite3 runs DDL in autocommit unless a transaction is already open,
+        # so begin one explicitly to make the DROP/CREATE/INSERT all-or-nothing
+        if not sql_connection.in_transaction:
+            sql_connection.execute('BEGIN')
+        sql_connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        sql_connection.execute(f'CREATE TABLE "{table_name}" ({col_defs})')
+        sql_connection.executemany(f'INSERT INTO "{table_name}" ({cols}) VALUES ({placeholders})',
+                                   _sqlite_rows(df))
 
     log_progress('Data loaded to Database as a table, Executing queries')
 
@@ -72,9 +206,7 @@ def run_query(query_statement, sql_connection):
     """ This function runs the query on the database table and
     prints the output on the terminal. Function returns nothing. """
 
-    cursor = sql_connection.cursor()
-    cursor.execute(query_statement)
-    result = cursor.fetchall()
+    result = sql_connection.execute(query_statement).fetchall()
     # for row in result:
     #     ic(row)
 
@@ -83,7 +215,54 @@ def run_query(query_statement, sql_connection):
     return result
 
 
+def run_queries(query_statements, sql_connection):
+    """ This function runs several queries on the database table
+    over one shared cursor. Function returns a list with the result
+    of each query. """
+
+    cursor = sql_connection.cursor()
+    results = []
+    for query_statement in query_statements:
+        cursor.execute(query_statement)
+        results.append(cursor.fetchall())
+    cursor.close()
+
+    log_progress('Process Complete')
+
+    return results
+
+
+def run_queries_parallel(query_statements, database_name):
+    """ This function runs independent queries concurrently, each in
+    its own thread on a separate read-only connection to the database
+    file. Only pays off for heavy queries; trivial ones are faster
+    through run_queries. Function returns the results in the order
+    given. """
+
+    import sqlite3
+
+    database_uri = f'{Path(database_name).resolve().as_uri()}?mode=ro'
+
+    def _run(query_statement):
+        sql_connection = sqlite3.connect(database_uri, uri=True)
+        try:
+            return run_query(query_statement, sql_connection)
+        finally:
+            sql_connection.close()
+
+    query_statements = list(query_statements)
+
+    # Log before any worker starts so the shared log handle is opened on this
+    # thread instead of being raced open by the workers
+    log_progress(f'Running {len(query_statements)} queries in parallel')
+
+    with ThreadPoolExecutor(max_workers=max(1, len(query_statements))) as executor:
+        return list(executor.map(_run, query_statements))
+
+
 if __name__ == '__main__':
+    import sqlite3
+
     url = 'https://web.archive.org/web/20230908091635/https://en.wikipedia.org/wiki/List_of_largest_banks'
     output_csv_path = './output/Largest_banks_data.csv'
     database_name = './output/Banks.db'
@@ -94,15 +273,20 @@ if __name__ == '__main__':
 
     df = extract(url, 'By market capitalization')
 
-    transform(df, './input/exchange_rate.csv')
+    df = transform(df, './input/exchange_rate.csv')
 
     load_to_csv(df, output_csv_path)
 
     with sqlite3.connect(database_name) as conn:
         load_to_db(df, conn, table_name)
 
-        print(run_query('SELECT * FROM Largest_banks', conn))
+        queries = ['SELECT * FROM Largest_banks',
+                   'SELECT AVG(MC_GBP_Billion) FROM Largest_banks',
+                   'SELECT "Bank name" FROM Largest_banks LIMIT 5']
 
-        print(run_query('SELECT AVG(MC_GBP_Billion) FROM Largest_banks', conn))
+        if _PARALLEL_QUERIES:
+            results = run_queries_parallel(queries, database_name)
+        else:
+            results = run_queries(queries, conn)
 
-        print(run_query('SELECT "Bank name" FROM Largest_banks LIMIT 5', conn))
+        sys.stdout.write('\n'.join(map(str, results)) + '\n')
@@ -1,12 +1,60 @@
 # Code for ETL operations on Country-GDP data
+import atexit
+import csv
+import hashlib
 import os
-from io import StringIO
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from io import BytesIO
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import sqlite3
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 # from icecream import ic
+# pandas, numpy and sqlite3 are imported where they are used to keep start-up light
+
+# Shared HTTP session so repeated fetches reuse keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                       max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# On-disk cache for archived pages; web.archive.org snapshots never change
+_CACHE_DIR = './cache'
+_IMMUTABLE_URL_PREFIX = 'https://web.archive.org/web/'
+
+# First table following the heading span whose text equals $s
+_TABLE_AFTER_SPAN_XPATH = '//span[normalize-space(text())=$s]/following::table[1]'
+
+# Set ETL_PARALLEL_QUERIES=1 to run the post-load queries in a thread pool. Only
+# worth it for heavy queries: for trivial SELECTs the extra connections cost more
+_PARALLEL_QUERIES = os.environ.get('ETL_PARALLEL_QUERIES', '0') == '1'
+
+# SQLite column types by numpy dtype kind; anything else is stored as TEXT
+_SQLITE_TYPES = {'b': 'INTEGER', 'i': 'INTEGER', 'u': 'INTEGER', 'f': 'REAL'}
+
+
+# Log file handle, opened lazily on the first log call and reused afterwards
+_LOG_FH = None
+
+# Set ETL_LOG=0 to skip writing log entries entirely
+_LOG_ENABLED = os.environ.get('ETL_LOG', '1') != '0'
+
+
+def _get_log_handle():
+    """Returns the shared line-buffered log file handle, opening it on first use.
+
+    The log directory is created if needed and the handle is closed at
+    interpreter exit.
+    """
+    global _LOG_FH
+    if _LOG_FH is None:
+        log_dir = './logs'
+        os.makedirs(log_dir, exist_ok=True)
+        _LOG_FH = open(os.path.join(log_dir, 'code_log.txt'), 'a', buffering=1)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
 
 
 def log_progress(message):
@@ -14,19 +62,14 @@ def log_progress(message):
 
     This function logs the mentioned message of a given stage of the
     code execution to a log file. If the log directory or file doesn't exist,
-    it will attempt to create them. Function returns nothing.
+    it will attempt to create them. Logging is skipped when the ETL_LOG
+    environment variable is set to 0. Function returns nothing.
     """
-
-    log_dir = './logs'
-    log_file = os.path.join(log_dir, 'code_log.txt')
+    if not _LOG_ENABLED:
+        return
 
     try:
-        # Ensure the log directory exists
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # Open the log file in append mode and write the log
-        with open(log_file, 'a') as f:
-            f.write(f'{datetime.now()}: {message}\n')
+        _get_log_handle().write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {message}\n")
     except PermissionError:
         print("Error: Insufficient permissions to write to the log file.")
     except Exception as e:
@@ -34,16 +77,60 @@ def log_progress(message):
 
 
 
+def fetch_page(url):
+    """Downloads a webpage and returns its raw content.
+
+    Archived web.archive.org snapshots are immutable, so they are stored in an
+    on-disk cache keyed by a hash of the URL and read from there on later
+    runs without touching the network. Other URLs are always downloaded.
+
+    Args:
+        url (str): The URL of the webpage to fetch.
+
+    Returns:
+        bytes: The raw page content.
+
+    Raises:
+        requests.exceptions.RequestException: If the download fails or the
+            server returns an error status.
+    """
+    cache_path = None
+    if url.startswith(_IMMUTABLE_URL_PREFIX):
+        cache_path = os.path.join(_CACHE_DIR, hashlib.blake2b(url.encode()).hexdigest())
+
+        # Serve the snapshot from the cache if it was downloaded before
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return f.read()
+
+    response = _SESSION.get(url, timeout=(5, 30), stream=False)
+    response.raise_for_status()  # Raise an HTTPError for bad responses (4xx and 5xx)
+
+    if cache_path is not None:
+        # Write to a temporary file first so an interrupted run never leaves a partial entry.
+        # The download already succeeded, so a cache that cannot be written is not fatal.
+        try:
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            with open(cache_path + '.tmp', 'wb') as f:
+                f.write(response.content)
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError as e:
+            log_progress(f"Could not write page cache {cache_path}: {e}")
+
+    return response.content
+
+
 def extract(url, table_attribs):
     """Extracts data from a webpage and returns it as a DataFrame.
 
-    This function fetches the webpage content, parses the HTML to locate the
-    specified table, and converts it into a DataFrame. It logs the progress
-    and handles exceptions gracefully.
+    This function fetches the webpage content, locates the first table after
+    the heading span with the given text using an lxml XPath query, and
+    converts it into a DataFrame. It logs the progress and handles exceptions
+    gracefully.
 
     Args:
         url (str): The URL of the webpage to extract data from.
-        table_attribs (str): The attribute of the target table to locate it.
+        table_attribs (str): The heading text preceding the target table, used to locate it.
 
     Returns:
         pd.DataFrame: The extracted data as a DataFrame.
@@ -51,24 +138,22 @@ def extract(url, table_attribs):
     Raises:
         ValueError: If data extraction fails or table is not found.
     """
+    import pandas as pd
+    from lxml import etree, html
+
     try:
-        # Fetch the webpage content
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4xx and 5xx)
-        
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('span', string=table_attribs)
-        
-        if table is None:
-            raise ValueError(f"Table with attributes '{table_attribs}' not found on the webpage.")
+        # Fetch the webpage content, from the on-disk cache when possible
+        content = fetch_page(url)
 
-        # Extract the table and convert to DataFrame
-        table = table.find_next('table')
-        if table is None:
-            raise ValueError("No table found after the specified span.")
+        # Parse the raw bytes so lxml detects the charset, then find the table in C
+        tree = html.fromstring(content)
+        tables = tree.xpath(_TABLE_AFTER_SPAN_XPATH, s=table_attribs)
 
-        df = pd.read_html(StringIO(str(table)))[0]
+        if not tables:
+            raise ValueError(f"Table with attributes '{table_attribs}' not found on the webpage.")
+
+        # Convert only the located table to a DataFrame
+        df = pd.read_html(BytesIO(etree.tostring(tables[0], method='html')), flavor='lxml')[0]
 
         # Log progress
         log_progress('Data extraction complete. Initiating Transformation process')
@@ -89,11 +174,35 @@ def extract(url, table_attribs):
     
 
 
+@lru_cache(maxsize=8)
+def _load_rates(csv_path, mtime):
+    """Reads the exchange rate CSV file, memoized by path and modification time.
+
+    The file is tiny, so it is parsed with the stdlib csv module rather than
+    pandas. The mtime argument is only part of the cache key, so an edited
+    file is read again on the next call.
+
+    Returns:
+        tuple: Immutable (currency, rate) pairs.
+    """
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+
+        # The header row names the columns; a missing 'Rate' column is a KeyError
+        header = next(reader, None)
+        if header is None or 'Rate' not in header:
+            raise KeyError('Rate')
+        rate_col = header.index('Rate')
+
+        return tuple((row[0], float(row[rate_col])) for row in reader if row)
+
+
 def transform(df, csv_path):
     """Transforms the DataFrame by adding market capitalization columns in different currencies.
 
-    This function reads exchange rate information from a CSV file and adds columns
-    to the DataFrame for market capitalization in GBP, EUR, INR, and PKR.
+    This function reads exchange rate information from a CSV file and returns a
+    new DataFrame with columns for market capitalization in GBP, EUR, INR, and PKR.
+    The input DataFrame is left unchanged.
 
     Args:
         df (pd.DataFrame): The input DataFrame containing 'Market cap (US$ billion)' column.
@@ -107,6 +216,9 @@ def transform(df, csv_path):
         FileNotFoundError: If the exchange rate CSV file is not found.
         KeyError: If the necessary exchange rates are not available in the CSV.
     """
+    import numpy as np
+    import pandas as pd
+
     try:
         # Validate input DataFrame
         if 'Market cap (US$ billion)' not in df.columns:
@@ -114,7 +226,7 @@ def transform(df, csv_path):
 
         # Load exchange rate data
         try:
-            exchange_rate = pd.read_csv(csv_path, index_col=0).to_dict()['Rate']
+            exchange_rate = dict(_load_rates(csv_path, os.path.getmtime(csv_path)))
         except FileNotFoundError:
             log_progress(f"Exchange rate file not found: {csv_path}")
             raise FileNotFoundError(f"Exchange rate file '{csv_path}' not found.")
@@ -122,14 +234,21 @@ def transform(df, csv_path):
             log_progress("The exchange rate file is missing the required 'Rate' column.")
             raise KeyError("The exchange rate file is missing the required 'Rate' column.")
 
-        # Add transformed columns
+        # Validate the required exchange rates
         currencies = ['GBP', 'EUR', 'INR', 'PKR']
         for currency in currencies:
             if currency not in exchange_rate:
                 log_progress(f"Exchange rate for {currency} not found in the CSV file.")
                 raise KeyError(f"Exchange rate for {currency} is missing in the exchange rate file.")
 
-            df[f'MC_{currency}_Billion'] = round(df['Market cap (US$ billion)'] * exchange_rate[currency], 2)
+        # Add transformed columns, converting all currencies in one broadcast
+        rates = np.array([exchange_rate[c] for c in currencies], dtype=np.float64)
+        mc = df['Market cap (US$ billion)'].to_numpy(dtype=np.float64, copy=False)
+        extra = pd.DataFrame(np.round(mc[:, None] * rates[None, :], 2),
+                             columns=[f'MC_{c}_Billion' for c in currencies], index=df.index)
+
+        # Attach all new columns at once to avoid a fragmented frame
+        df = pd.concat([df, extra], axis=1)
 
         # Log success
         log_progress("Data transformation complete. Initiating Loading process.")
@@ -169,8 +288,14 @@ def load_to_csv(df, output_path):
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Save the DataFrame to CSV
-        df.to_csv(output_path, index=False)
+        # Save the DataFrame to CSV, using polars' parallel writer when installed.
+        # polars needs pyarrow to convert string columns, so fall back to pandas
+        # when either is missing
+        try:
+            import polars as pl
+            pl.from_pandas(df).write_csv(output_path)
+        except ImportError:
+            df.to_csv(output_path, index=False)
 
         # Log progress
         log_progress(f"Data successfully saved to {output_path}")
@@ -188,6 +313,19 @@ def load_to_csv(df, output_path):
         raise RuntimeError(f"An unexpected error occurred while saving CSV: {e}") from e
 
 
+def _sqlite_rows(df):
+    """Returns the DataFrame rows as tuples of values sqlite3 can bind.
+
+    Missing values (NaN, NaT, pd.NA) become None so they are stored as NULL,
+    and datetimes become ISO 8601 strings.
+    """
+    values = df.astype(object)
+    for col, dtype in df.dtypes.items():
+        if dtype.kind == 'M':
+            values[col] = df[col].map(lambda ts: ts.isoformat(), na_action='ignore')
+    return values.where(df.notna(), None).itertuples(index=False, name=None)
+
+
 def load_to_db(df, sql_connection, table_name):
     """Saves the given DataFrame to a database table.
 
@@ -197,7 +335,7 @@ def load_to_db(df, sql_connection, table_name):
 
     Args:
         df (pd.DataFrame): The DataFrame to save.
-        sql_connection: A SQLAlchemy database connection or engine.
+        sql_connection (sqlite3.Connection): The SQLite database connection.
         table_name (str): The name of the database table.
 
     Returns:
@@ -212,8 +350,28 @@ def load_to_db(df, sql_connection, table_name):
         if df is None or df.empty:
             raise ValueError("The provided DataFrame is empty or None.")
 
-        # Save the DataFrame to the database
-        df.to_sql(table_name, sql_connection, if_exists='replace', index=False)
+        # Bulk-load settings: the database is rebuilt on every run, so durability
+        # is traded for speed
+        sql_connection.execute('PRAGMA journal_mode=MEMORY')
+        sql_connection.execute('PRAGMA synchronous=OFF')
+        sql_connection.execute('PRAGMA temp_store=MEMORY')
+
+        # Build the table definition from the DataFrame dtypes
+        cols = ', '.join('"{}"'.format(c.replace('"', '""')) for c in df.columns)
+        col_defs = ', '.join('"{}" {}'.format(c.replace('"', '""'), _SQLITE_TYPES.get(t.kind, 'TEXT'))
+                             for c, t in df.dtypes.items())
+        placeholders = ', '.join('?' * len(df.columns))
+
+        # Replace the table and insert all rows with one executemany in a single transaction.
+        # sqlite3 runs DDL in autocommit unless a transaction is already open, so begin
+        # one explicitly; a failed insert then rolls back to the previous table.
+        with sql_connection:
+            if not sql_connection.in_transaction:
+                sql_connection.execute('BEGIN')
+            sql_connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            sql_connection.execute(f'CREATE TABLE "{table_name}" ({col_defs})')
+            sql_connection.executemany(f'INSERT INTO "{table_name}" ({cols}) VALUES ({placeholders})',
+                                       _sqlite_rows(df))
 
         # Log progress
         log_progress(f"Data successfully loaded to the database table '{table_name}'. Executing queries.")
@@ -245,14 +403,8 @@ def run_query(query_statement, sql_connection):
         RuntimeError: For any database-related issues.
     """
     try:
-        # Create a cursor object
-        cursor = sql_connection.cursor()
-
-        # Execute the query
-        cursor.execute(query_statement)
-
-        # Fetch the results
-        result = cursor.fetchall()
+        # Execute the query on the connection's implicit cursor and fetch the results
+        result = sql_connection.execute(query_statement).fetchall()
 
         # Log progress
         log_progress("Query executed successfully. Process complete.")
@@ -267,13 +419,102 @@ def run_query(query_statement, sql_connection):
         log_progress(f"Unexpected error during query execution: {e}")
         raise RuntimeError(f"An unexpected error occurred while executing the query: {e}") from e
 
+
+def run_queries(query_statements, sql_connection):
+    """Runs several queries on the database over one shared cursor.
+
+    This function opens a single cursor, executes each query in order and
+    collects every result set, closing the cursor once at the end. If an
+    error occurs, it logs the error and re-raises the exception.
+
+    Args:
+        query_statements (iterable of str): The SQL queries to be executed.
+        sql_connection: The database connection object.
+
+    Returns:
+        list: One list of result tuples per query, in the order given.
+
+    Raises:
+        RuntimeError: For any database-related issues.
+    """
+    try:
+        # Create a single cursor shared by all queries
+        cursor = sql_connection.cursor()
+
+        # Execute each query and fetch its results
+        results = []
+        for query_statement in query_statements:
+            cursor.execute(query_statement)
+            results.append(cursor.fetchall())
+
+        # Log progress
+        log_progress(f"{len(results)} queries executed successfully. Process complete.")
+
+        return results
+
+    except sql_connection.Error as e:
+        log_progress(f"Database error: {e}")
+        raise RuntimeError(f"An error occurred while executing the queries: {e}") from e
+
+    except Exception as e:
+        log_progress(f"Unexpected error during query execution: {e}")
+        raise RuntimeError(f"An unexpected error occurred while executing the queries: {e}") from e
+
     finally:
         # Ensure the cursor is closed
         if 'cursor' in locals() and cursor:
             cursor.close()
 
 
+
+def run_queries_parallel(query_statements, database_name):
+    """Runs independent read-only queries on the database concurrently.
+
+    Each query runs in its own worker thread on a separate read-only
+    connection to the database file, so the queries overlap while sqlite3
+    releases the GIL. Results are returned in the order the queries were given.
+    Opening the extra connections and threads costs more than trivial SELECTs,
+    so this only pays off for heavy queries; use run_queries otherwise.
+
+    Args:
+        query_statements (iterable of str): The SQL queries to be executed.
+        database_name (str): Path to the SQLite database file.
+
+    Returns:
+        list: One list of result tuples per query, in the order given.
+
+    Raises:
+        RuntimeError: For any database-related issues.
+    """
+    import sqlite3
+
+    database_uri = f'{Path(database_name).resolve().as_uri()}?mode=ro'
+
+    def _run(query_statement):
+        try:
+            sql_connection = sqlite3.connect(database_uri, uri=True)
+        except sqlite3.Error as e:
+            log_progress(f"Database error: {e}")
+            raise RuntimeError(f"Failed to open the database '{database_name}' read-only: {e}") from e
+
+        try:
+            return run_query(query_statement, sql_connection)
+        finally:
+            sql_connection.close()
+
+    query_statements = list(query_statements)
+
+    # Log before any worker starts so the shared log handle is opened on this
+    # thread instead of being raced open by the workers
+    log_progress(f'Running {len(query_statements)} queries in parallel')
+
+    with ThreadPoolExecutor(max_workers=max(1, len(query_statements))) as executor:
+        return list(executor.map(_run, query_statements))
+
+
 if __name__ == '__main__':
+    import sqlite3
+
     try:
         # Input and output paths
         url = 'https://web.archive.org/web/20230908091635/https://en.wikipedia.org/wiki/List_of_largest_banks'
@@ -293,7 +534,7 @@ if __name__ == '__main__':
 
         # Transformation
         try:
-            transform(df, './input/exchange_rate.csv')
+            df = transform(df, './input/exchange_rate.csv')
         except Exception as e:
             log_progress(f"Transformation failed: {e}")
             raise RuntimeError("ETL process halted during transformation.") from e
@@ -310,34 +551,34 @@ if __name__ == '__main__':
             with sqlite3.connect(database_name) as conn:
                 load_to_db(df, conn, table_name)
 
-                # Query 1: Select all records
+                queries = [
+                    'SELECT * FROM Largest_banks',
+                    'SELECT AVG(MC_GBP_Billion) FROM Largest_banks',
+                    'SELECT "Bank name" FROM Largest_banks LIMIT 5',
+                ]
+
+                # Run all three queries over one cursor on the open connection,
+                # or concurrently on read-only connections when opted in
                 try:
-                    result = run_query('SELECT * FROM Largest_banks', conn)
-                    print("All Records:")
-                    for row in result:
-                        print(row)
+                    if _PARALLEL_QUERIES:
+                        all_records, avg_market_cap, bank_names = run_queries_parallel(queries, database_name)
+                    else:
+                        all_records, avg_market_cap, bank_names = run_queries(queries, conn)
                 except Exception as e:
-                    log_progress(f"Query 1 failed: {e}")
+                    log_progress(f"Queries failed: {e}")
                     raise
 
+                # Query 1: Select all records
+                print("All Records:")
+                sys.stdout.write('\n'.join(map(repr, all_records)) + '\n')
+
                 # Query 2: Calculate the average market capitalization
-                try:
-                    result = run_query('SELECT AVG(MC_GBP_Billion) FROM Largest_banks', conn)
-                    print("\nAverage Market Capitalization (in GBP Billion):")
-                    print(result[0][0])
-                except Exception as e:
-                    log_progress(f"Query 2 failed: {e}")
-                    raise
+                print("\nAverage Market Capitalization (in GBP Billion):")
+                print(avg_market_cap[0][0])
 
                 # Query 3: Fetch the first five bank names
-                try:
-                    result = run_query('SELECT "Bank name" FROM Largest_banks LIMIT 5', conn)
-                    print("\nFirst 5 Bank Names:")
-                    for row in result:
-                        print(row[0])
-                except Exception as e:
-                    log_progress(f"Query 3 failed: {e}")
-                    raise
+                print("\nFirst 5 Bank Names:")
+                sys.stdout.write('\n'.join(row[0] for row in bank_names) + '\n')
         except Exception as e:
             log_progress(f"Database load or query execution failed: {e}")
             raise RuntimeError("ETL process halted during database operations.") from e
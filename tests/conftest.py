@@ -0,0 +1,16 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The ETL scripts live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(params=['banks_project', 'banks_project_with_exceptions'])
+def etl(request, monkeypatch, tmp_path):
+    """Loads one of the ETL scripts, run from a scratch directory so logs and caches stay out of the repo."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'logs').mkdir()
+    return importlib.import_module(request.param)
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+import requests
+
+URL = 'https://web.archive.org/web/20230908091635/https://en.wikipedia.org/wiki/List_of_largest_banks'
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'List_of_largest_banks.html')
+
+
+@pytest.fixture
+def offline_etl(etl, monkeypatch):
+    """Serves the saved copy of the page instead of downloading it."""
+    with open(FIXTURE_PATH, 'rb') as f:
+        page = f.read()
+
+    def fake_request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = page
+        return response
+
+    monkeypatch.setattr(requests.Session, 'request', fake_request)
+    return etl
+
+
+def test_extract_finds_market_cap_table(offline_etl):
+    df = offline_etl.extract(URL, 'By market capitalization')
+
+    assert list(df.columns) == ['Rank', 'Bank name', 'Market cap (US$ billion)']
+    assert len(df) == 10
+    assert df['Bank name'].iloc[0] == 'JPMorgan Chase'
+    assert df['Market cap (US$ billion)'].iloc[0] == pytest.approx(432.92)
+
+
+def test_extract_uses_the_table_after_the_given_heading(offline_etl):
+    df = offline_etl.extract(URL, 'By total assets')
+
+    assert 'Total assets (2022) (US$ billion)' in df.columns
+
+
+@pytest.mark.parametrize('etl', ['banks_project_with_exceptions'], indirect=True)
+def test_extract_raises_when_heading_is_missing(offline_etl):
+    with pytest.raises(ValueError, match='not found'):
+        offline_etl.extract(URL, 'By net income')
@@ -0,0 +1,27 @@
+import types
+
+URL = 'https://web.archive.org/web/20230908091635/https://en.wikipedia.org/wiki/List_of_largest_banks'
+
+
+def _fake_get(url, **kwargs):
+    return types.SimpleNamespace(content=b'<html></html>', raise_for_status=lambda: None)
+
+
+def test_fetch_page_caches_archived_snapshots(etl, monkeypatch, tmp_path):
+    monkeypatch.setattr(etl, '_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(etl._SESSION, 'get', _fake_get)
+
+    assert etl.fetch_page(URL) == b'<html></html>'
+
+    # The second call must be served from disk without touching the network
+    monkeypatch.setattr(etl._SESSION, 'get', None)
+    assert etl.fetch_page(URL) == b'<html></html>'
+
+
+def test_fetch_page_returns_download_when_cache_is_not_writable(etl, monkeypatch, tmp_path):
+    not_a_dir = tmp_path / 'not_a_dir'
+    not_a_dir.write_text('')
+    monkeypatch.setattr(etl, '_CACHE_DIR', str(not_a_dir / 'cache'))
+    monkeypatch.setattr(etl._SESSION, 'get', _fake_get)
+
+    assert etl.fetch_page(URL) == b'<html></html>'
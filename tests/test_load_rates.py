@@ -0,0 +1,20 @@
+import os
+
+import banks_project
+
+
+def _write_rates(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_load_rates_reads_currency_rate_pairs(etl, tmp_path):
+    csv_path = _write_rates(tmp_path / 'exchange_rate.csv', 'Currency,Rate\nEUR,0.97\nGBP,0.8\n')
+
+    assert etl._load_rates(csv_path, os.path.getmtime(csv_path)) == (('EUR', 0.97), ('GBP', 0.8))
+
+
+def test_load_rates_skips_header_whatever_its_wording(tmp_path):
+    csv_path = _write_rates(tmp_path / 'exchange_rate.csv', 'currency,rate\nINR,86\n')
+
+    assert banks_project._load_rates(csv_path, os.path.getmtime(csv_path)) == (('INR', 86.0),)
@@ -0,0 +1,18 @@
+import sys
+import types
+
+import pandas as pd
+
+
+def _polars_without_pyarrow(df):
+    raise ImportError("pyarrow is required for converting a pandas dataframe to Polars")
+
+
+def test_load_to_csv_falls_back_to_pandas_when_polars_cannot_convert(etl, monkeypatch, tmp_path):
+    monkeypatch.setitem(sys.modules, 'polars', types.SimpleNamespace(from_pandas=_polars_without_pyarrow))
+    df = pd.DataFrame({'Bank name': ['JPMorgan Chase'], 'MC_GBP_Billion': [346.34]})
+    output_path = tmp_path / 'Largest_banks_data.csv'
+
+    etl.load_to_csv(df, str(output_path))
+
+    assert output_path.read_text().splitlines() == ['Bank name,MC_GBP_Billion', 'JPMorgan Chase,346.34']
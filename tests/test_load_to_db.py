@@ -0,0 +1,61 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    yield conn
+    conn.close()
+
+
+def test_load_to_db_creates_columns_from_dtypes(etl, conn):
+    df = pd.DataFrame({
+        'Rank': [1],
+        'Bank name': ['JPMorgan Chase'],
+        'Market cap (US$ billion)': [432.92],
+        'Listed': [True],
+        'As of': [pd.Timestamp('2023-09-08')],
+    })
+
+    etl.load_to_db(df, conn, 'Largest_banks')
+
+    schema = [(name, col_type) for _, name, col_type, *_ in conn.execute('PRAGMA table_info("Largest_banks")')]
+    assert schema == [
+        ('Rank', 'INTEGER'),
+        ('Bank name', 'TEXT'),
+        ('Market cap (US$ billion)', 'REAL'),
+        ('Listed', 'INTEGER'),
+        ('As of', 'TEXT'),
+    ]
+    assert conn.execute('SELECT * FROM Largest_banks').fetchall() == [
+        (1, 'JPMorgan Chase', 432.92, 1, '2023-09-08T00:00:00'),
+    ]
+
+
+def test_load_to_db_stores_missing_values_as_null(etl, conn):
+    df = pd.DataFrame({
+        'Rank': pd.array([1, None], dtype='Int64'),
+        'Bank name': pd.array(['HDFC Bank', None], dtype='string'),
+        'Market cap (US$ billion)': [157.91, float('nan')],
+        'As of': [pd.Timestamp('2023-09-08'), pd.NaT],
+    })
+
+    etl.load_to_db(df, conn, 'Largest_banks')
+
+    assert conn.execute('SELECT * FROM Largest_banks').fetchall() == [
+        (1, 'HDFC Bank', 157.91, '2023-09-08T00:00:00'),
+        (None, None, None, None),
+    ]
+
+
+def test_load_to_db_keeps_previous_table_when_insert_fails(etl, conn):
+    etl.load_to_db(pd.DataFrame({'Bank name': ['JPMorgan Chase']}), conn, 'Largest_banks')
+
+    # A dict cannot be bound as an SQLite parameter, so the insert fails
+    with pytest.raises(Exception):
+        etl.load_to_db(pd.DataFrame({'Bank name': [{'not': 'bindable'}]}), conn, 'Largest_banks')
+
+    assert conn.execute('SELECT "Bank name" FROM Largest_banks').fetchall() == [('JPMorgan Chase',)]
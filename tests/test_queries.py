@@ -0,0 +1,34 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Largest_banks ("Bank name" TEXT, MC_GBP_Billion REAL)')
+    conn.executemany('INSERT INTO Largest_banks VALUES (?, ?)',
+                     [('JPMorgan Chase', 346.34), ('Bank of America', 185.22)])
+    yield conn
+    conn.close()
+
+
+def test_run_queries_returns_one_result_per_query_in_order(etl, conn):
+    results = etl.run_queries([
+        'SELECT AVG(MC_GBP_Billion) FROM Largest_banks',
+        'SELECT "Bank name" FROM Largest_banks LIMIT 1',
+    ], conn)
+
+    assert results == [[(265.78,)], [('JPMorgan Chase',)]]
+
+
+def test_run_queries_parallel_matches_serial_results(etl, conn, tmp_path):
+    database_name = str(tmp_path / 'Banks.db')
+    with sqlite3.connect(database_name) as file_conn:
+        conn.backup(file_conn)
+    queries = [
+        'SELECT AVG(MC_GBP_Billion) FROM Largest_banks',
+        'SELECT "Bank name" FROM Largest_banks',
+    ]
+
+    assert etl.run_queries_parallel(queries, database_name) == etl.run_queries(queries, conn)